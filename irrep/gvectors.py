@@ -16,10 +16,13 @@
 ##################################################################
 
 
+import logging
 import numpy as np
 import numpy.linalg as la
 from .readfiles import Hartree_eV
 
+log = logging.getLogger(__name__)
+
 
 class NotSymmetryError(RuntimeError):
     """
@@ -47,7 +50,7 @@ def calc_gvectors(
     Ecut1=-1,
     thresh=1e-3,
     spinor=True,
-    nplanemax=10000,
+    nplanemax=None,
 ):
     """ 
     Generates G-vectors taking part in the plane-wave expansion of 
@@ -74,8 +77,10 @@ def calc_gvectors(
     spinor : bool, default=True
         `True` if wave functions are spinors, `False` if they are scalars. It 
         will be read from DFT files. Mandatory for `vasp`.
-    nplanemax : int, default=10000
-        Sets the maximun number of iterations when calculating vectors.
+    nplanemax : int or array, shape=(3,), default=None
+        Upper bound for the absolute value of the direct coordinates of 
+        G-vectors along each reciprocal lattice vector (e.g. to fit them in 
+        an FFT grid). By default, only the cutoff `Ecut` is applied.
 
     Returns
     -------
@@ -91,47 +96,65 @@ def calc_gvectors(
     if Ecut1 <= 0:
         Ecut1 = Ecut
     B = RecLattice
-
-    igp = np.zeros(3)
-    igall = []
-    Eg = []
-    memory = np.full(10, True)
-    for N in range(nplanemax):
-        flag = True
-        if N % 10 == 0:
-            print(N, len(igall))
-        # if len(igall) >= nplane / (2 if spinor else 1):
-        #     break
-        if len(igall) >= nplane / 2:    # Only enters if vasp
-            if spinor:
-                break
-            else:      # Sure that not spinors?
-                if len(igall) >= nplane: # spinor=F, all plane waves found
-                    break
-                elif np.all(memory): # probably spinor wrong set as spinor=F
-                    raise RuntimeError(
-                          "calc_gvectors is stuck "
-                          "calculating plane waves of energy larger "
-                          "than cutoff Ecut = {}. Make sure that the "
-                          "VASP calculation does not include SOC and "
-                          "set -spinor if it does.".format(Ecut)
-                    )
-
-        for ig3 in range(-N, N + 1):
-            for ig2 in range(-(N - abs(ig3)), N - abs(ig3) + 1):
-                for ig1 in set([-(N - abs(ig3) - abs(ig2)), N - abs(ig3) - abs(ig2)]):
-                    igp = (ig1, ig2, ig3)
-                    etot = la.norm((K + np.array(igp)).dot(B)) ** 2 / twomhbar2
-                    if etot < Ecut:
-                        igall.append(igp)
-                        Eg.append(etot)
-                        flag = False
-        memory[:-1] = memory[1:]
-        memory[-1] = flag
-
-    ncnt = len(igall)
+    K = np.asarray(K, dtype=float)
+
+    # |K+G| < Gmax bounds each direct coordinate of K+G by Gmax times the
+    # length of the corresponding column of inv(B) (dual basis)
+    Gmax = np.sqrt(Ecut * twomhbar2)
+    Nmax = Gmax * la.norm(la.inv(B), axis=0)
+    igmin = np.floor(-K - Nmax).astype(int)
+    igmax = np.ceil(-K + Nmax).astype(int)
+    if nplanemax is not None:
+        igmin = np.maximum(igmin, -np.asarray(nplanemax))
+        igmax = np.minimum(igmax, nplanemax)
+    # G-vectors are generated in the order of WaveTrans (and VASP): ig3 is
+    # the slowest index and ig1 the fastest, each of them running over
+    # 0, 1, ..., igmax and then igmin, ..., -1. Thus, no sorting is needed
+    ranges = []
+    for n1, n2 in zip(igmin, igmax):
+        r = np.arange(n1, n2 + 1)
+        ranges.append(np.concatenate((r[r >= 0], r[r < 0])))
+    # the box is evaluated plane by plane along ig3 to keep memory bounded.
+    # Within a plane the energy is a quadratic polynomial in ig3 whose 
+    # coefficients depend only on (ig1, ig2), so they are computed once
+    ig12 = np.stack(
+        np.meshgrid(ranges[0], ranges[1], indexing="xy"), axis=-1
+    ).reshape(-1, 2)
+    kG12 = (K[:2] + ig12).dot(B[:2]) + K[2] * B[2]
+    E0 = np.einsum("ij,ij->i", kG12, kG12) / twomhbar2
+    E1 = 2 * kG12.dot(B[2]) / twomhbar2
+    E2 = B[2].dot(B[2]) / twomhbar2
+    # accepted vectors are written to buffers that grow geometrically. The
+    # initial size is the volume of the cutoff sphere over that of the 
+    # reciprocal unit cell, which is usually enough
+    cap = int(1.1 * 4 * np.pi / 3 * Gmax ** 3 / abs(la.det(B))) + 64
+    igall = np.empty((cap, 3), dtype=np.int32)
+    Eg = np.empty(cap)
+    ncnt = 0
+    for ig3 in ranges[2]:
+        etot = E0 + ig3 * (E1 + ig3 * E2)
+        mask = etot < Ecut
+        n = np.count_nonzero(mask)
+        if n == 0:
+            continue
+        newcap = cap
+        while ncnt + n > newcap:
+            newcap *= 2
+        if newcap > cap:
+            cap = newcap
+            igall = np.concatenate(
+                (igall[:ncnt], np.empty((cap - ncnt, 3), dtype=np.int32))
+            )
+            Eg = np.concatenate((Eg[:ncnt], np.empty(cap - ncnt)))
+        igall[ncnt:ncnt + n, :2] = ig12[mask]
+        igall[ncnt:ncnt + n, 2] = ig3
+        Eg[ncnt:ncnt + n] = etot[mask]
+        ncnt += n
+    igall = igall[:ncnt]
+    Eg = Eg[:ncnt]
+
+    log.debug("G-vectors in box %s..%s: %d below Ecut", igmin, igmax, ncnt)
     #    print ("\n".join("{0:+4d}  {1:4d} {2:4d}  |  {3:6d}".format(ig[0],ig[1],ig[2],np.abs(ig).sum()) for ig in igall) )
-    #    print (len(igall),len(set(igall)))
     if nplane < np.Inf: # vasp
         if spinor:
             if 2 * ncnt != nplane:
@@ -141,35 +164,38 @@ def calc_gvectors(
                     )
                 )
         else:
+            if 2 * ncnt == nplane: # probably spinor wrong set as spinor=F
+                raise RuntimeError(
+                      "calc_gvectors found half of the plane waves "
+                      "expected for cutoff Ecut = {}. Make sure that the "
+                      "VASP calculation does not include SOC and "
+                      "set -spinor if it does.".format(Ecut)
+                )
             if ncnt != nplane:
                 raise RuntimeError(
                     "*** error - computed ncnt={0} != input nplane={1}".format(
                         ncnt, nplane
                     )
                 )
-    igall = np.array(igall, dtype=int)
-    ng = igall.max(axis=0) - igall.min(axis=0)
-    igall1 = igall % ng[None, :]
-    #    print ("ng=",ng)
-    #    print ("igall1=",igall1)
-    igallsrt = np.argsort((igall1[:, 2] * ng[1] + igall1[:, 1]) * ng[0] + igall1[:, 0])
-    #    print (igallsrt)
-    igall1 = igall[igallsrt]
-    Eg = np.array(Eg)[igallsrt]
-    #    print (igall1)
-    igall = np.zeros((ncnt, 6), dtype=int)
-    igall[:, :3] = igall1
-    #    print (igall)
-    igall[:, 3] = np.arange(ncnt)
-    igall = igall[Eg <= Ecut1]
-    Eg = Eg[Eg <= Ecut1]
-    srt = np.argsort(Eg)
+    ig6 = np.zeros((ncnt, 6), dtype=np.int32)
+    ig6[:, :3] = igall
+    ig6[:, 3] = np.arange(ncnt)
+    select = Eg <= Ecut1
+    igall = ig6[select]
+    Eg = Eg[select]
+    srt = np.argsort(Eg, kind="stable")
     Eg = Eg[srt]
     igall = igall[srt, :].T
-    wall = [0] + list(np.where(Eg[1:] - Eg[:-1] > thresh)[0] + 1) + [igall.shape[1]]
-    for i in range(len(wall) - 1):
-        igall[4, wall[i] : wall[i + 1]] = wall[i]
-        igall[5, wall[i] : wall[i + 1]] = wall[i + 1]
+    wall = np.hstack(
+        [
+            [0],
+            np.where(Eg[1:] - Eg[:-1] > thresh)[0] + 1,
+            [igall.shape[1]],
+        ]
+    )
+    counts = np.diff(wall)
+    igall[4] = np.repeat(wall[:-1], counts)
+    igall[5] = np.repeat(wall[1:], counts)
     #    print ("K={0}\n E={1}\nigall=\n{2}".format(K,Eg,igall.T))
     return igall
 
@@ -239,15 +265,19 @@ def sortIG(ik, kg, kpt, CG, RecLattice, Ecut0, Ecut, spinor):
     eKG = eKG[sel]
     srt = np.argsort(eKG)
     eKG = eKG[srt]
-    igall = np.zeros((6, len(sel)), dtype=int)
+    igall = np.zeros((6, len(sel)), dtype=np.int32)
     igall[:3, :] = kg[srt].T
     igall[3, :] = srt
-    wall = (
-        [0] + list(np.where(eKG[1:] - eKG[:-1] > thresh)[0] + 1) + [igall.shape[1]]
+    wall = np.hstack(
+        [
+            [0],
+            np.where(eKG[1:] - eKG[:-1] > thresh)[0] + 1,
+            [igall.shape[1]],
+        ]
     )
-    for i in range(len(wall) - 1):
-        igall[4, wall[i] : wall[i + 1]] = wall[i]
-        igall[5, wall[i] : wall[i + 1]] = wall[i + 1]
+    counts = np.diff(wall)
+    igall[4] = np.repeat(wall[:-1], counts)
+    igall[5] = np.repeat(wall[1:], counts)
 
     if spinor:
         CG = CG[:, np.hstack((sel[srt], sel[srt] + npw))]
@@ -256,6 +286,41 @@ def sortIG(ik, kg, kpt, CG, RecLattice, Ecut0, Ecut, spinor):
 
     return CG, igall
 
+def kpoint_invariant(kpt, As):
+    """
+    Determines which of the transformation matrices `As` leave the k-point 
+    invariant, up to a reciprocal lattice vector.
+
+    Parameters
+    ----------
+    kpt : array, shape=(3,)
+        Direct coordinates of the k-point.
+    As : array, shape=(nop,3,3)
+        Each element is a matrix describing the tranformation of basis 
+        vectors of the unit cell under a symmetry operation.
+
+    Returns
+    -------
+    array, shape=(nop,)
+        `True` if the corresponding operation belongs to the little-group 
+        of the k-point.
+    """
+    return _kpoint_transform(kpt, As)[2]
+
+
+def _kpoint_transform(kpt, As):
+    """
+    Transform the k-point by each of the matrices `As`. Returns the matrices 
+    B=inv(A).T, the difference between the transformed and the original 
+    k-point (in direct coordinates) and whether this difference is a 
+    reciprocal lattice vector.
+    """
+    Bs = np.linalg.inv(As).transpose(0, 2, 1)
+    dkpt = Bs.dot(kpt) - kpt
+    invariant = np.isclose(np.round(dkpt), dkpt).all(axis=1)
+    return Bs, dkpt, invariant
+
+
 def transformed_g(kpt, ig, RecLattice, A):
     """
     Determines how the transformation matrix `A` reorders the reciprocal
@@ -283,48 +348,147 @@ def transformed_g(kpt, ig, RecLattice, A):
     -------
     rotind : array
         `rotind[i]`=`j` if `A`*`ig[:,i]`==`ig[:,j]`.
+"""
+    return transformed_g_batch(kpt, ig, RecLattice, np.array([A]))[0]
+
+
+def transformed_g_batch(kpt, ig, RecLattice, As, chunk=8):
+    """
+    Determines how each of the transformation matrices `As` reorders the 
+    reciprocal lattice vectors taking part in the plane-wave expansion of 
+    wave-functions. The lookup table of g-vectors is built once for all 
+    the operations.
+
+    Parameters
+    ----------
+    kpt : array, shape=(3,)
+        Direct coordinates of the k-point.
+    ig : array
+        Every column corresponds to a plane-wave of energy smaller than 
+        `Ecut`. The number of rows is 6: the first 3 contain direct 
+        coordinates of the plane-wave, the fourth row stores indices needed
+        to short plane-waves based on energy (ascending order). Fitfth 
+        (sixth) row contains the index of the first (last) groups of 
+        plane-waves of identical energy.
+    RecLattice : array, shape=(3,3)
+        Each row contains the cartesian coordinates of a basis vector forming 
+        the unit-cell in reciprocal space.
+    As : array, shape=(nop,3,3)
+        Each element is a matrix describing the tranformation of basis 
+        vectors of the unit cell under a symmetry operation.
+    chunk : int, default=8
+        Number of operations transformed at once.
+    
+    Returns
+    -------
+    rotind : array, shape=(nop,ng)
+        `rotind[o,i]`=`j` if `As[o]`*`ig[:,i]`==`ig[:,j]`.
 """
     #    Btrr=RecLattice.dot(A).dot(np.linalg.inv(RecLattice))
     #    Btr=np.array(np.round(Btrr),dtype=int) # The transformed rec. lattice expressed in the basis of the original rec. lattice
     #    if np.sum(np.abs(Btr-Btrr))>1e-6:
     #        raise NotSymmetryError("The lattice is not invariant under transformation \n {0}".format(A))
-    B = np.linalg.inv(A).T
-    kpt_ = B.dot(kpt)
-    dkpt = np.array(np.round(kpt_ - kpt), dtype=int)
-    #    print ("Transformation\n",A)
-    #    print ("kpt ={0} -> {1}".format(kpt,kpt_))
-    if not np.isclose(dkpt, kpt_ - kpt).all():
+    As = np.asarray(As)
+    Bs, dkpt, invariant = _kpoint_transform(kpt, As)
+    if not invariant.all():
+        o = np.where(~invariant)[0][0]
         raise NotSymmetryError(
             "The k-point {0} is transformed to non-equivalent point {1}  under transformation\n {2}".format(
-                kpt, kpt_, A
+                kpt, kpt + dkpt[o], As[o]
             )
         )
+    return _transformed_g(kpt, ig, As, Bs, dkpt, chunk)
+
+
+def transformed_g_little_group(kpt, ig, RecLattice, As, chunk=8):
+    """
+    Selects the transformation matrices `As` that leave the k-point 
+    invariant and determines how each of them reorders the reciprocal 
+    lattice vectors taking part in the plane-wave expansion of 
+    wave-functions. Equivalent to `kpoint_invariant` followed by 
+    `transformed_g_batch` on the selected matrices.
 
-    igTr = B.dot(ig[:3, :]) + dkpt[:, None]  # the transformed
-    igTr = np.array(np.round(igTr), dtype=int)
-    #    print ("the original g-vectors :\n",ig)
-    #    print ("the transformed g-vectors :\n",igTr)
-    ng = ig.shape[1]
-    rotind = -np.ones(ng, dtype=int)
-    for i in range(ng):
-        for j in range(ig[4, i], ig[5, i]):
-            if (igTr[:, i] == ig[:3, j]).all():
-                rotind[i] = j
-                break
-        if rotind[i] == -1:
+    Parameters
+    ----------
+    kpt : array, shape=(3,)
+        Direct coordinates of the k-point.
+    ig : array
+        Every column corresponds to a plane-wave of energy smaller than 
+        `Ecut`. The number of rows is 6: the first 3 contain direct 
+        coordinates of the plane-wave, the fourth row stores indices needed
+        to short plane-waves based on energy (ascending order). Fitfth 
+        (sixth) row contains the index of the first (last) groups of 
+        plane-waves of identical energy.
+    RecLattice : array, shape=(3,3)
+        Each row contains the cartesian coordinates of a basis vector forming 
+        the unit-cell in reciprocal space.
+    As : array, shape=(nop,3,3)
+        Each element is a matrix describing the tranformation of basis 
+        vectors of the unit cell under a symmetry operation.
+    chunk : int, default=8
+        Number of operations transformed at once.
+
+    Returns
+    -------
+    invariant : array, shape=(nop,)
+        `True` if the corresponding operation belongs to the little-group 
+        of the k-point.
+    rotind : array, shape=(nop_little,ng)
+        `rotind[o,i]`=`j` if `As[invariant][o]`*`ig[:,i]`==`ig[:,j]`.
+    """
+    As = np.asarray(As)
+    Bs, dkpt, invariant = _kpoint_transform(kpt, As)
+    rotind = _transformed_g(
+        kpt, ig, As[invariant], Bs[invariant], dkpt[invariant], chunk
+    )
+    return invariant, rotind
+
+
+def _transformed_g(kpt, ig, As, Bs, dkpt, chunk):
+    """
+    Reordering of plane-waves under the matrices `As` that leave the 
+    k-point invariant, given B=inv(A).T and the shifts `dkpt` returned by 
+    `_kpoint_transform`. See `transformed_g_batch`.
+    """
+    dkpt = np.array(np.round(dkpt), dtype=int)
+
+    # g-vectors are encoded by an integer key and looked up by bisection. 
+    # The table is built once, the operations are treated in chunks to 
+    # bound the size of the temporary arrays
+    mn = ig[:3, :].min(axis=1)
+    ng = ig[:3, :].max(axis=1) - mn + 1
+    weights = np.array([1, ng[0], ng[0] * ng[1]])
+    key_ig = weights @ (ig[:3, :] - mn[:, None])
+    order = np.argsort(key_ig).astype(np.int32)
+    key_sorted = key_ig[order]
+    rotind = np.empty((len(As), ig.shape[1]), dtype=np.int32)
+    for start in range(0, len(As), chunk):
+        ops = slice(start, start + chunk)
+        # the transformed g-vectors
+        igTr = np.einsum("oij,jg->oig", Bs[ops], ig[:3, :]) + dkpt[ops, :, None]
+        igTr = np.array(np.round(igTr), dtype=np.int32)
+        key_tr = weights @ (igTr - mn[:, None])
+        pos = np.searchsorted(key_sorted, key_tr)
+        rotind_ = order[np.minimum(pos, len(order) - 1)]
+        rotind_[(ig[:3, rotind_].transpose(1, 0, 2) != igTr).any(axis=1)] = -1
+        # a symmetry can only map a g-vector within its group of identical energy
+        rotind_[(rotind_ < ig[4]) | (rotind_ >= ig[5])] = -1
+        notfound = np.argwhere(rotind_ == -1)
+        if len(notfound) > 0:
+            o, i = notfound[0]
             raise RuntimeError(
                     "Error in the transformation of plane-waves in k-point={}: "
                     .format(kpt) +
-                    "Not pair found for the g-vector igTr[{i}]={igtr}"
-                    .format(i=i, igtr=igTr[:,i]) +
+                    "Not pair found for the g-vector igTr[{i}]={igtr} "
+                    .format(i=i, igtr=igTr[o,:,i]) +
                     "obtained when transforming the g-vector ig[{i}]={ig} "
-                    .format(i=i, ig=ig[:3,i] +
-                    "with the matrix {B}, where B=inv(A).T with A={A}"
-                    .format(B=B, A=A) +
-                    "other g-vectors with the same energy:\n{other}"
-                    .format(other)
-                )
+                    .format(i=i, ig=ig[:3,i]) +
+                    "with the matrix {B}, where B=inv(A).T with A={A}. "
+                    .format(B=Bs[start + o], A=As[start + o]) +
+                    "Other g-vectors with the same energy:\n{other}"
+                    .format(other=ig[:3, ig[4,i]:ig[5,i]])
             )
+        rotind[ops] = rotind_
     return rotind
 
 
@@ -370,25 +534,88 @@ def symm_eigenvalues(
     array
         Each element is the trace of the symmetry operation in a wave-function.
     """
-    npw1 = igall.shape[1]
     multZ = np.exp(
         -1.0j * (2 * np.pi * np.linalg.inv(A).dot(T).dot(igall[:3, :] + K[:, None]))
     )
     igrot = transformed_g(K, igall, RecLattice, A)
+    return _symm_traces(WF, igrot, multZ, S, spinor)
+
+
+def symm_eigenvalues_batch(
+    K, RecLattice, WF, igall, As, Ss, Ts, spinor, igrot=None
+):
+    """
+    Calculate the traces of several symmetry operations for the 
+    wave-functions in a particular k-point. Equivalent to calling 
+    `symm_eigenvalues` for each operation, but the lookup table used to 
+    transform the plane-waves is built once for all the operations.
+
+    Parameters
+    ----------
+    K : array, shape=(3,)
+        Direct coordinates of the k-point.
+    RecLattice : array, shape=(3,3)
+        Each row contains the cartesian coordinates of a basis vector forming 
+        the unit-cell in reciprocal space.
+    WF : array
+        `WF[i,j]` contains the coefficient corresponding to :math:`j^{th}`
+        plane-wave in the expansion of the wave-function in :math:`i^{th}`
+        band. It contains only plane-waves of energy smaller than `Ecut`.
+    igall : array
+        Returned by `__sortIG`.
+        Every column corresponds to a plane-wave of energy smaller than 
+        `Ecut`. The number of rows is 6: the first 3 contain direct 
+        coordinates of the plane-wave, the fourth row stores indices needed
+        to short plane-waves based on energy (ascending order). Fitfth 
+        (sixth) row contains the index of the first (last) plane-wave with 
+        the same energy as the plane-wave of the current column.
+    As : array, shape=(nop,3,3)
+        Matrices describing the tranformation of basis vectors of the unit 
+        cell under each symmetry operation.
+    Ss : array, shape=(nop,2,2)
+        Matrices describing how spinors transform under each symmetry.
+    Ts : array, shape=(nop,3)
+        Translational parts of the symmetry operations, in terms of the 
+        basis vectors of the unit cell.
+    spinor : bool
+        `True` if wave-functions are spinors, `False` if they are scalars.
+    igrot : array, shape=(nop,ng), default=None
+        Reordering of plane-waves under each operation, as returned by 
+        `transformed_g_batch`. Calculated if not given.
+
+    Returns
+    -------
+    array, shape=(nop,nbnd)
+        Element `[o,i]` is the trace of operation `o` in wave-function `i`.
+    """
+    As = np.asarray(As)
+    if igrot is None:
+        igrot = transformed_g_batch(K, igall, RecLattice, As)
+    ATs = np.einsum("oij,oj->oi", np.linalg.inv(As), Ts)
+    kg = igall[:3, :] + K[:, None]
+    traces = []
+    for o in range(len(As)):
+        multZ = np.exp(-1.0j * (2 * np.pi * ATs[o].dot(kg)))
+        traces.append(_symm_traces(WF, igrot[o], multZ, Ss[o], spinor))
+    return np.array(traces)
+
+
+def _symm_traces(WF, igrot, multZ, S, spinor):
+    """
+    Traces of a symmetry operation for the wave-functions, given the 
+    reordering `igrot` of plane-waves and the phase factors `multZ` 
+    induced by the operation. See `symm_eigenvalues`.
+    """
     if spinor:
-        part1 = WF[:, igrot].conj() * WF[:, :npw1] * S[0, 0]
-        part2 = (
-            WF[:, igrot + npw1].conj() * WF[:, npw1:] * S[1, 1]
-            + WF[:, igrot].conj() * WF[:, npw1:] * S[0, 1]
-            + WF[:, igrot + npw1].conj() * WF[:, :npw1] * S[1, 0]
-        )
-        return np.dot(part1 + part2, multZ)
+        # spin-up and spin-down coefficients are stored one after the other
+        WFg = WF.reshape(WF.shape[0], 2, len(igrot))
+        return np.einsum("msg,msg,g->m", WFg[:, :, igrot].conj(), S @ WFg, multZ)
     else:
-        return np.dot(WF[:, igrot].conj() * WF[:, :], multZ)
+        return np.einsum("mg,mg,g->m", WF[:, igrot].conj(), WF, multZ)
 
 
 def symm_matrix(
-    K, RecLattice, WF, igall, A, S, T, spinor
+    K, RecLattice, WF, igall, A, S, T, spinor, igrot=None
 ):
     """
     Computes the matrix S_mn = <Psi_m|{A|T}|Psi_n>
@@ -422,6 +649,9 @@ def symm_matrix(
         vectors of the unit cell.
     spinor : bool
         `True` if wave functions are spinors, `False` if they are scalars.
+    igrot : array, default=None
+        Reordering of plane-waves under the operation, as returned by 
+        `transformed_g`. Calculated if not given.
 
     Returns
     -------
@@ -431,11 +661,16 @@ def symm_matrix(
     """
     npw1 = igall.shape[1]
     multZ = np.exp(-1.0j * (2 * np.pi * A.dot(T).dot(igall[:3, :] + K[:, None])))
-    igrot = transformed_g(K, igall, RecLattice, A)
+    if igrot is None:
+        igrot = transformed_g(K, igall, RecLattice, A)
+    # the contraction over plane-waves (and spin) is a single matrix product,
+    # which runs in parallel if numpy is linked to a multithreaded BLAS
+    nbnd = WF.shape[0]
     if spinor:
-        WF1 = np.stack([WF[:, igrot], WF[:, igrot + npw1]], axis=2).conj()
-        WF2 = np.stack([WF[:, :npw1], WF[:, npw1:]], axis=2)
-        #        print (WF1.shape,WF2.shape,multZ.shape,S.shape)
-        return np.einsum("mgs,ngt,g,st->mn", WF1, WF2, multZ, S)
+        # spin-up and spin-down coefficients are stored one after the other
+        assert WF.shape[1] == 2 * npw1
+        WF2 = WF.reshape(nbnd, 2, npw1)
+        WF1 = WF2[:, :, igrot].conj() * multZ
+        return WF1.reshape(nbnd, -1) @ (S @ WF2).reshape(nbnd, -1).T
     else:
-        return np.einsum("mg,ng,g->mn", WF[:, igrot].conj(), WF, multZ)
+        return (WF[:, igrot].conj() * multZ) @ WF.T
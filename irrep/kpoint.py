@@ -19,7 +19,7 @@ import h5py
 import numpy as np
 import numpy.linalg as la
 import copy
-from .gvectors import calc_gvectors, symm_eigenvalues, NotSymmetryError, symm_matrix, sortIG
+from .gvectors import calc_gvectors, symm_eigenvalues_batch, transformed_g_little_group, symm_matrix, sortIG
 from .readfiles import Hartree_eV
 from .readfiles import record_abinit
 from .utility import compstr, is_round
@@ -145,23 +145,68 @@ class Kpoint:
         """
         symmetries = {}
         #        print ("calculating symmetry eigenvalues for E={0}, WF={1} SG={2}".format(self.Energy,self.WF.shape,symmetries_SG) )
-        if not (self.symmetries_SG is None):
-            for symop in self.symmetries_SG:
-                try:
-                    symmetries[symop] = symm_eigenvalues(
-                        self.K,
-                        self.RecLattice,
-                        self.WF,
-                        self.ig,
-                        symop.rotation,
-                        symop.spinor_rotation,
-                        symop.translation,
-                        self.spinor,
-                    )
-                except NotSymmetryError as err:
-                    pass  # print  ( err )
+        if len(self.little_group) > 0:
+            # operations of the little-group are treated all at once
+            symops = list(self.little_group)
+            traces = symm_eigenvalues_batch(
+                self.K,
+                self.RecLattice,
+                self.WF,
+                self.ig,
+                np.array([symop.rotation for symop in symops]),
+                np.array([symop.spinor_rotation for symop in symops]),
+                np.array([symop.translation for symop in symops]),
+                self.spinor,
+                igrot=list(self.little_group.values()),
+            )
+            symmetries = dict(zip(symops, traces))
+        self._release_little_group()
         return symmetries
 
+    @LazyProperty
+    def little_group(self):
+        """
+        Sets the attribute `Kpoint.little_group` to a dictionary. Works as a 
+        lazy-property, so instances created by `copy_sub` share it rather 
+        than recomputing it.
+
+        Returns
+        -------
+        little_group : dict
+            Each key is an instance of `class` `SymmetryOperation` 
+            corresponding to an operation in the little-(co)group and the 
+            attached value is an array describing how the operation 
+            reorders the plane-waves (see `transformed_g_batch`).
+
+        Notes
+        -----
+        The table holds an `int32` index per plane-wave and operation, i.e. 
+        192 bytes per plane-wave for a little-group of 48 operations, which 
+        may exceed the size of the wave-functions. Each instance releases 
+        it once its traces are computed (see `_release_little_group`).
+        """
+        little_group = {}
+        if self.symmetries_SG:
+            invariant, igrot = transformed_g_little_group(
+                self.K,
+                self.ig,
+                self.RecLattice,
+                np.array([symop.rotation for symop in self.symmetries_SG]),
+            )
+            symops = [
+                symop for symop, inv in zip(self.symmetries_SG, invariant) if inv
+            ]
+            little_group = dict(zip(symops, igrot))
+        return little_group
+
+    def _release_little_group(self):
+        """
+        Drop the reference of this instance to `little_group`. The table is 
+        freed once every sub-space sharing it has dropped it too, and it is 
+        computed again if accessed later.
+        """
+        self.__dict__.pop("_little_group", None)
+
     def __init__(
         self,
         ik,
@@ -442,6 +487,7 @@ class Kpoint:
             symop.spinor_rotation,
             symop.translation,
             self.spinor,
+            igrot=self.little_group.get(symop),
         )
         # check orthogonality
         S1 = self.WF.conj().dot(self.WF.T)
@@ -782,7 +828,7 @@ class Kpoint:
             self.RecLattice,
             Ecut,
             spinor=self.spinor,
-            nplanemax=np.max([ngx, ngy, ngz]) // 2,
+            nplanemax=(np.array([ngx, ngy, ngz]) - 1) // 2,
         )
 
         selectG = tuple(ig[0:3])
@@ -0,0 +1,93 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from irrep.gvectors import (
+    NotSymmetryError,
+    calc_gvectors,
+    kpoint_invariant,
+    symm_eigenvalues,
+    symm_eigenvalues_batch,
+    transformed_g,
+    transformed_g_batch,
+    transformed_g_little_group,
+    twomhbar2,
+)
+
+
+def test_calc_gvectors_wavetrans_order():
+
+    # simple cubic cell with |b|=1: G-vectors with |G|^2 < 4.5, so that both
+    # +2 and -2 occur along every axis
+    Ecut = 4.5 / twomhbar2
+    ig = calc_gvectors(np.zeros(3), np.eye(3), Ecut, spinor=False)
+
+    # WaveTrans loops over ig3 (slowest) to ig1 (fastest), each running over
+    # 0, 1, ..., N and then -N, ..., -1
+    axis = [0, 1, 2, -2, -1]
+    expected = [
+        (ig1, ig2, ig3)
+        for ig3 in axis
+        for ig2 in axis
+        for ig1 in axis
+        if ig1 ** 2 + ig2 ** 2 + ig3 ** 2 < 4.5
+    ]
+
+    # the fourth row stores the position of each vector before sorting by energy
+    assert (np.sort(ig[3]) == np.arange(len(expected))).all()
+    generated = ig[:3, np.argsort(ig[3])].T
+    assert [tuple(g) for g in generated] == expected
+
+
+def _cubic_rotations():
+    """Signed permutation matrices: the point group of a cubic lattice."""
+    rotations = []
+    for perm in itertools.permutations(range(3)):
+        for signs in itertools.product((1, -1), repeat=3):
+            A = np.zeros((3, 3))
+            A[range(3), perm] = signs
+            rotations.append(A)
+    return np.array(rotations)
+
+
+def test_batch_matches_single_operation():
+
+    K = np.array([0.5, 0.0, 0.0])
+    RecLattice = np.eye(3)
+    ig = calc_gvectors(K, RecLattice, 10 / twomhbar2, spinor=False)
+    As = _cubic_rotations()
+
+    invariant = kpoint_invariant(K, As)
+    assert 0 < invariant.sum() < len(As)
+    for A, inv in zip(As, invariant):
+        assert kpoint_invariant(K, A[None])[0] == inv
+    with pytest.raises(NotSymmetryError):
+        transformed_g_batch(K, ig, RecLattice, As)
+    invariant_, igrot = transformed_g_little_group(K, ig, RecLattice, As)
+    assert (invariant_ == invariant).all()
+    assert (transformed_g_batch(K, ig, RecLattice, As[invariant]) == igrot).all()
+
+    # chunks that do not divide the number of operations
+    As = As[invariant]
+    igrot = transformed_g_batch(K, ig, RecLattice, As, chunk=3)
+    for A, rotind in zip(As, igrot):
+        assert (transformed_g(K, ig, RecLattice, A) == rotind).all()
+
+    rng = np.random.default_rng(0)
+    Ts = rng.random((len(As), 3))
+    Ss = np.linalg.qr(rng.normal(size=(len(As), 2, 2)))[0].astype(complex)
+    for spinor in (False, True):
+        npw = ig.shape[1] * (2 if spinor else 1)
+        WF = rng.normal(size=(4, npw)) + 1.0j * rng.normal(size=(4, npw))
+        traces = symm_eigenvalues_batch(K, RecLattice, WF, ig, As, Ss, Ts, spinor)
+        assert np.allclose(
+            symm_eigenvalues_batch(
+                K, RecLattice, WF, ig, As, Ss, Ts, spinor, igrot=igrot
+            ),
+            traces,
+        )
+        for A, S, T, tr in zip(As, Ss, Ts, traces):
+            assert np.allclose(
+                symm_eigenvalues(K, RecLattice, WF, ig, A, S, T, spinor), tr
+            )